@@ -0,0 +1,159 @@
+import numpy as np
+from numba import njit
+
+"""
+Compiled hand evaluation for the poker probability calculator.
+
+eval5 takes the packed card ints from poker_probability, the 7-card kernels take card ids (0 to 51)
+along with the deck arrays indexed by them. Every lookup table is passed in as a numpy array,
+so this module only holds the numba kernels and no tables of its own.
+"""
+
+
+# suit counts are packed 4 bits per suit at bit 4 * suit index (0 to 3), like the rank histogram
+SUIT_LANES = 0x1111
+
+@njit(cache = True, boundscheck = False)
+def _suits_with_at_least(suit_counts, count):
+    """
+    Gives the packed suit counts with the top bit of each lane set where that suit has at least count cards, 0 if none do.
+    Adding 8 - count to every lane sets its top bit only when the lane reaches count (lanes hold at most 7).
+    """
+    return (suit_counts + (8 - count) * SUIT_LANES) & (8 * SUIT_LANES)
+
+@njit(cache = True, boundscheck = False)
+def _fold_cards(card_ids, deck):
+    """
+    Folds card ids into the state the 7-card tables are keyed on.
+    Returns (hist, suit_counts, suit_masks), the rank histogram, the packed suit counts
+    and the rank mask of each suit (indexed by suit index).
+    """
+
+    card_rank, card_suit, card_bits = deck
+
+    hist = 0
+    suit_counts = 0
+    suit_masks = np.zeros(4, dtype = np.int64)
+    for card_id in card_ids:
+        suit = card_suit[card_id]
+        hist += 1 << (4 * card_rank[card_id])
+        suit_counts += 1 << (4 * suit)
+        suit_masks[suit] |= card_bits[card_id]
+    return hist, suit_counts, suit_masks
+
+@njit(cache = True, boundscheck = False)
+def eval5(c1, c2, c3, c4, c5, flush_rank, unique_rank, prime_keys, prime_ranks):
+    """Ranks five card ints by table lookup, higher is better."""
+    rank_bits = (c1 | c2 | c3 | c4 | c5) >> 16
+
+    # all five cards share the suit bit
+    if c1 & c2 & c3 & c4 & c5 & 0xF000:
+        return flush_rank[rank_bits]
+
+    # five different ranks, straight or high card
+    rank = unique_rank[rank_bits]
+    if rank:
+        return rank
+
+    # repeated ranks, product of primes is the same for any order
+    prime_product = (c1 & 0xFF) * (c2 & 0xFF) * (c3 & 0xFF) * (c4 & 0xFF) * (c5 & 0xFF)
+    return prime_ranks[np.searchsorted(prime_keys, prime_product)]
+
+@njit(cache = True, boundscheck = False)
+def eval7(card_ids, deck, flush7, nonflush7_keys, nonflush7_ranks):
+    """Ranks the best 5-card hand out of 5 to 7 card ids without trying every five, higher is better."""
+    hist, suit_counts, suit_masks = _fold_cards(card_ids, deck)
+
+    # with 7 cards a flush always beats anything else the cards could make
+    if _suits_with_at_least(suit_counts, 5):
+        return max(flush7[suit_masks[0]], flush7[suit_masks[1]], flush7[suit_masks[2]], flush7[suit_masks[3]])
+
+    return nonflush7_ranks[np.searchsorted(nonflush7_keys, hist)]
+
+@njit(cache = True, boundscheck = False)
+def _community_state(comm, deck):
+    """
+    Folds the five community cards once, for every hand played on them.
+    Returns (hist, flush_suit, flush_mask): the community rank histogram, the suit index of the only suit
+    that can still make a flush (-1 if none) and the community rank mask of that suit.
+    """
+
+    hist, suit_counts, suit_masks = _fold_cards(comm, deck)
+
+    # five community cards leave at most one suit with the three cards a flush needs
+    flush_suit = -1
+    flush_mask = 0
+    flush_lanes = _suits_with_at_least(suit_counts, 3)
+    if flush_lanes:
+        for suit in range(4):
+            if flush_lanes >> (4 * suit + 3) & 1:
+                flush_suit = suit
+                flush_mask = suit_masks[suit]
+
+    return hist, flush_suit, flush_mask
+
+@njit(cache = True, boundscheck = False)
+def _eval_with_community(comm_state, first, second, deck, flush7, nonflush7_keys, nonflush7_ranks):
+    """Ranks two hole cards (card ids) on the community cards, only adding the two cards to comm_state."""
+    card_rank, card_suit, card_bits = deck
+    comm_hist, flush_suit, flush_mask = comm_state
+
+    if flush_suit >= 0:
+        suit_mask = flush_mask
+        if card_suit[first] == flush_suit:
+            suit_mask |= card_bits[first]
+        if card_suit[second] == flush_suit:
+            suit_mask |= card_bits[second]
+        flush_rank = flush7[suit_mask]
+        if flush_rank:
+            return flush_rank
+
+    hist = comm_hist + (1 << (4 * card_rank[first])) + (1 << (4 * card_rank[second]))
+    return nonflush7_ranks[np.searchsorted(nonflush7_keys, hist)]
+
+@njit(cache = True, boundscheck = False)
+def simulate(my_hand, comm, remaining_ids, deck, flush7, nonflush7_keys, nonflush7_ranks):
+    """
+    Plays my_hand against every pair of cards in remaining_ids, with comm as the five community cards.
+    All cards are card ids. Returns (wins, ties), counted over every opponent hand.
+    """
+
+    card_rank, card_suit = deck[0], deck[1]
+
+    # community cards are the same for my hand and every opponent, so fold them in once
+    comm_state = _community_state(comm, deck)
+    flush_suit = comm_state[1]
+
+    my_score = _eval_with_community(comm_state, my_hand[0], my_hand[1], deck, flush7, nonflush7_keys, nonflush7_ranks)
+
+    # an opponent card only matters through its rank and whether it is in the one suit that can flush,
+    # so cards are grouped that way (group 2 * rank, plus 1 if in the flush suit) with one card kept per group
+    group_size = np.zeros(26, dtype = np.int64)
+    group_card = np.zeros(26, dtype = np.int64)
+    for card_id in remaining_ids:
+        group = 2 * card_rank[card_id] + (card_suit[card_id] == flush_suit)
+        group_size[group] += 1
+        group_card[group] = card_id
+
+    wins = 0
+    ties = 0
+
+    # each pair of groups is played once and counted for every opponent hand it stands for
+    for first in range(26):
+        for second in range(first, 26):
+            if first == second:
+                hands = group_size[first] * (group_size[first] - 1) // 2
+            else:
+                hands = group_size[first] * group_size[second]
+            if not hands:
+                continue
+
+            # two cards from one group share a rank, so playing its kept card twice ranks the same
+            opp_score = _eval_with_community(comm_state, group_card[first], group_card[second], deck, flush7, nonflush7_keys, nonflush7_ranks)
+
+            if my_score > opp_score: # win
+                wins += hands
+            elif my_score == opp_score:
+                ties += hands
+
+    return wins, ties
@@ -1,6 +1,10 @@
-from collections import Counter
-from itertools import combinations
-from math import comb
+from functools import lru_cache
+from itertools import combinations, combinations_with_replacement
+from math import comb, prod
+
+import numpy as np
+
+import fasteval
 
 import tkinter as tk
 from tkinter import messagebox
@@ -21,6 +25,7 @@ RANKS = ["2", "3", "4", "5", "6", "7", "8", "9", "10", "J", "Q", "K", "A"] # ace
 # indexes 0 to 12 for 2 to 13/A
 SUIT_NAMES = {"H": "Hearts", "D": "Diamonds", "C": "Clubs", "S": "Spades"}
 RANK_NAMES = {"2": "2", "3": "3", "4": "4", "5": "5", "6": "6", "7": "7", "8": "8", "9": "9", "10": "10", "J": "Jack", "Q": "Queen", "K": "King", "A": "Ace"} # ace marked as highest for high card reasons
+RANK_VALUE = {rank: value for value, rank in enumerate(RANKS)} # rank to its index, 0 for 2 up to 12 for A
 
 
 POKER_GREEN = "#35654d"
@@ -30,35 +35,48 @@ TEXT_COLOR = "#FFFFFF"
 
 
 
-class Card: 
-    def __init__(self, rank, suit):
-        if rank not in RANKS:
-            raise ValueError(f"Invalid rank: {rank}")
-        if suit not in SUITS:
-            raise ValueError(f"Invalid suit: {suit}")
-        
-        self.rank = rank
-        self.suit = suit
-        self.rank_value = RANKS.index(rank)
+# each card is packed into a single int (Cactus Kev encoding):
+# bits 0-7 hold the rank prime, bits 8-11 the rank value, bits 12-15 one bit for the suit
+# and bits 16-28 one bit for the rank, so hand checks are bit operations on plain ints
+RANK_PRIMES = [2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37, 41] # one prime per rank, 2 to A
+SUIT_BITS = {"H": 0x1, "D": 0x2, "C": 0x4, "S": 0x8}
 
-    def __str__(self):
-        return f"{self.rank}{self.suit}"
 
-    def __repr__(self):
-        return self.__str__()
+def make_card(rank, suit):
+    """Packs a rank and suit into a card int."""
+    if rank not in RANK_VALUE:
+        raise ValueError(f"Invalid rank: {rank}")
+    if suit not in SUIT_BITS:
+        raise ValueError(f"Invalid suit: {suit}")
 
-    def __eq__(self, other):
-        if isinstance(other, Card):
-            return self.rank == other.rank and self.suit == other.suit
-        return False
-    
-def create_deck():
-    """Creates a 52-card deck."""
-    return [Card(rank, suit) for rank in RANKS for suit in SUITS]
+    rank_value = RANK_VALUE[rank]
+    return RANK_PRIMES[rank_value] | (rank_value << 8) | (SUIT_BITS[suit] << 12) | (1 << (16 + rank_value))
+
+def card_rank(card):
+    """Gets rank value (0 for 2 up to 12 for A) of a card int."""
+    return (card >> 8) & 0xF
+
+def card_suit(card):
+    """Gets suit letter of a card int."""
+    return SUITS[((card >> 12) & 0xF).bit_length() - 1]
+
+def card_to_str(card):
+    """Turns a card int back into its string, like AS or 10D."""
+    return f"{RANKS[card_rank(card)]}{card_suit(card)}"
+
+# 52-card deck
+DECK = tuple(make_card(rank, suit) for rank in RANKS for suit in SUITS)
+
+# the deck split into one array per field for the compiled evaluator, indexed by card id (position in DECK)
+CARD_ID = {card: card_id for card_id, card in enumerate(DECK)}
+CARD_RANK = np.array([card_rank(card) for card in DECK], dtype = np.int8)
+CARD_SUIT = np.array([SUITS.index(card_suit(card)) for card in DECK], dtype = np.int8) # suit index, 0 to 3
+CARD_BITS = np.array([card >> 16 for card in DECK], dtype = np.int16) # 13-bit rank mask
+DECK_ARRAYS = (CARD_RANK, CARD_SUIT, CARD_BITS)
 
 def card_evaluator(card_str):
     """
-    Takes string representation of card and makes it a Card object. 
+    Takes string representation of card and makes it a card int. 
     Input format is rank then suit. 
     """
 
@@ -66,15 +84,39 @@ def card_evaluator(card_str):
         raise ValueError(f"Invalid format of card: {card_str}. Use format like AS or 10D)")
     rank, suit = card_str[:-1].upper(), card_str[-1].upper()
 
-    if rank not in RANKS: 
+    if rank not in RANK_VALUE: 
         raise ValueError(f"Invalid rank: {rank}. Valid ranks are 2, 3, 4, 5, 6, 7, 8, 9, 10, J, Q, K, A")
-    if suit not in SUITS: 
+    if suit not in SUIT_BITS: 
         raise ValueError(f"Invalid suit: {suit}. Valid suits are: H, D, C, S")
-    return Card(rank, suit)
-
-def hand_evaluator(cards):
+    return make_card(rank, suit)
+
+# 13-bit rank masks of the ten straights to their high card, A-5 included with 5 high
+STRAIGHT_BITMASKS = {0b11111 << low: low + 4 for low in range(9)}
+STRAIGHT_BITMASKS[0b1000000001111] = 3
+
+# how many cards of each rank (most first) to the score of that hand without a straight or flush
+PATTERN_SCORES = {
+    (4, 1): 7, # four of a kind
+    (3, 2): 6, # full house
+    (3, 1, 1): 3, # three of a kind
+    (2, 2, 1): 2, # two pair
+    (2, 1, 1, 1): 1, # one pair
+    (1, 1, 1, 1, 1): 0 # high card
+}
+
+def _pack_score(score, tie_breakers):
+    """Packs a score (0-9) and its tie-breakers into one int, score << 20 then one 4-bit slot per tie-breaker."""
+    packed = score
+    for slot in range(5):
+        packed <<= 4
+        if slot < len(tie_breakers):
+            packed |= tie_breakers[slot]
+    return packed
+
+def _score_five(ranks, flush):
     """
-    Evaluates a 5-card poker hand to return score and tie-breaker information. 
+    Scores a 5-card poker hand from its rank values (sorted high to low) and whether it is a flush.
+    Only used to build the lookup tables below.
 
     Hand rankings by score
     9: Royal Flush (straight, flush, AKQJ10)
@@ -88,146 +130,211 @@ def hand_evaluator(cards):
     1: One Pair (one pair, need to know value)
     0: High Card (purely value based)
     
-    Returns a tuple (score, [tie_breakers])
+    Returns a single int with the score in the top bits and up to five tie-breakers (4 bits each) below,
+    so a bigger int is always the better hand.
     """
 
-    if len(cards) != 5:
-        raise ValueError("We can only have a five card hand to evaluate.")
-    
-    sorted_cards = sorted(cards, key = lambda card: card.rank_value, reverse = True)
-    
-    ranks = [card.rank_value for card in sorted_cards]
-    suits = [card.suit for card in sorted_cards]
+    # one pass counts each rank and builds the 13-bit mask of ranks present
+    counts = [0] * 13
+    rank_bits = 0
+    for rank in ranks:
+        counts[rank] += 1
+        rank_bits |= 1 << rank
 
-    # Count occurrences of each rank
-    rank_counts = Counter(ranks)
+    # checks for straight, one lookup also gives the high card
+    straight_high = STRAIGHT_BITMASKS.get(rank_bits, -1) # default fails
+    straight = straight_high >= 0
 
-    # check for flush
-    flush = len(set(suits)) == 1
+    # Royal flush (straight, flush, A, K, Q, J, 10)
+    if straight and flush and straight_high == 12:
+        return _pack_score(9, []) # no rank marker, this is best possible hand
 
-    # checks for straight
-    straight = False
-    straight_high = -1 # default fails
+    # Straight flush (straight and flush)
+    if straight and flush: 
+        return _pack_score(8, [straight_high])
 
-    if len(set(ranks)) == 5 and max(ranks) - min(ranks) == 4:
-        straight = True
-        straight_high = max(ranks)
+    # ranks ordered by how often they show up then by value, which is also the tie-breaker order
+    ordered = sorted((rank for rank in range(13) if counts[rank]), key = lambda rank: (-counts[rank], -rank))
+    score = PATTERN_SCORES[tuple(counts[rank] for rank in ordered)]
 
-    elif set(ranks) == {0, 1, 2, 3, 12}: # 12 is ace, checks for A-5 case
-        straight = True
-        straight_high = 3
+    # flushes and straights need five different ranks
+    if score == 0:
+        # flush
+        if flush:
+            return _pack_score(5, ordered)
 
-    # Royal flush (straight, flush, A, K, Q, J, 10)
-    if straight and flush and (12 in ranks) and (straight_high == 12):
-        return (9, []) # no rank marker, this is best possible hand
+        # straight
+        if straight:
+            return _pack_score(4, [straight_high])
 
-    # Straight flush (straight and flush)
-    if straight and flush: 
-        return (8, [straight_high])
-
-    # Four of a kind
-    for rank, count in rank_counts.items():
-        if count == 4:
-            tie_breaker = [val for val in ranks if val != rank][0]
-            return (7, [rank, tie_breaker])
-
-    # Full house (three of a kind and pair)
-    three_val = None
-    pair_val = None
-    for rank, count, in rank_counts.items():
-        if count == 3: 
-            three_val = rank
-        elif count == 2:
-            pair_val = rank
-    
-    if three_val is not None and pair_val is not None:
-        return (6, [three_val, pair_val])
-
-    # flush
-    if flush:
-        return (5, ranks)
-
-    # straight
-    if straight:
-        return (4, [straight_high])
-
-    # three of a kind
-    for rank, count in rank_counts.items():
-        if count == 3:
-            other_cards = sorted([val for val in ranks if val != rank], reverse = True)
-            return (3, [rank] + other_cards)
-    
-    # two pair
-    pairs = []
-    for rank, count in rank_counts.items(): 
-        if count == 2:
-            pairs.append(rank)
+    # Four of a kind, full house, three of a kind, two pair, one pair or high card
+    return _pack_score(score, ordered)
+
+
+def _build_rank_tables():
+    """
+    Scores every distinct 5-card hand once and numbers them from 1 (worst high card) 
+    to 7462 (royal flush), so hands can be ranked by lookups instead of evaluated.
+
+    Returns (flush_rank, unique_rank, prime_rank, rank_category):
+    flush_rank keyed by the 13-bit rank mask of a flush, 
+    unique_rank keyed by the rank mask of five different ranks (straights and high cards),
+    prime_rank keyed by the product of rank primes for hands with a repeated rank,
+    rank_category gives the 0-9 score category of each rank.
+    """
+
+    flush_scores = {}
+    unique_scores = {}
+    prime_scores = {}
+
+    # rank combinations come out sorted high to low
+    for ranks in combinations_with_replacement(range(12, -1, -1), 5):
+        if ranks[0] == ranks[4]: # five of a kind is not possible
+            continue
+
+        if len(set(ranks)) == 5:
+            rank_bits = sum(1 << rank for rank in ranks)
+            flush_scores[rank_bits] = _score_five(list(ranks), True)
+            unique_scores[rank_bits] = _score_five(list(ranks), False)
+        else:
+            prime_product = prod(RANK_PRIMES[rank] for rank in ranks)
+            prime_scores[prime_product] = _score_five(list(ranks), False)
 
-    if len(pairs) == 2:
-        pairs.sort(reverse = True)
-        tie_breaker = [val for val in ranks if val not in pairs][0]
-        return (2, pairs + [tie_breaker])
+    # order all scores from worst to best
+    all_scores = sorted(score for table in (flush_scores, unique_scores, prime_scores) for score in table.values())
+    score_rank = {score: index + 1 for index, score in enumerate(all_scores)}
 
+    rank_category = [0] + [score >> 20 for score in all_scores]
 
-    # one pair
-    for rank, count in rank_counts.items():
-        if count == 2:
-            other_cards = sorted([val for val in ranks if val != rank], reverse = True)
-            return (1, [rank] + other_cards)
+    def to_ranks(table):
+        return {key: score_rank[score] for key, score in table.items()}
 
+    return to_ranks(flush_scores), to_ranks(unique_scores), to_ranks(prime_scores), rank_category
 
-    # high card
-    return (0, sorted(ranks, reverse = True))
+FLUSH_RANK, UNIQUE_RANK, PRIME_RANK, RANK_CATEGORY = _build_rank_tables()
 
+# numpy copies of the 5-card tables for the compiled evaluator, masks index straight into an array
+FLUSH_RANK_ARRAY = np.zeros(1 << 13, dtype = np.int32)
+FLUSH_RANK_ARRAY[list(FLUSH_RANK)] = list(FLUSH_RANK.values())
+UNIQUE_RANK_ARRAY = np.zeros(1 << 13, dtype = np.int32)
+UNIQUE_RANK_ARRAY[list(UNIQUE_RANK)] = list(UNIQUE_RANK.values())
+PRIME_RANK_KEYS = np.array(sorted(PRIME_RANK), dtype = np.int64)
+PRIME_RANK_RANKS = np.array([PRIME_RANK[key] for key in PRIME_RANK_KEYS.tolist()], dtype = np.int32)
 
-def compare_scores(score1, score2):
+def _build_seven_tables():
     """
-    Compares two poker hands and returns:
-    1 if score1 is better, 
-    -1 if score2 is better,
-    0 if equal
+    Extends the 5-card tables to 6 and 7 cards, keeping the best five each time.
+
+    Returns (flush7, nonflush7):
+    flush7 is a list indexed by the 13-bit rank mask of one suit, 0 unless the mask has 5 or more ranks,
+    nonflush7 is keyed by the rank histogram of the cards (4 bits counting each rank, 2 in the lowest).
     """
 
-    # compares type of hand
-    if score1[0] > score2[0]:
-        return 1
-    
-    elif score1[0] < score2[0]:
-        return -1
+    # removing any one rank from a mask gives a smaller mask, so those are always filled in first
+    flush7 = [0] * (1 << 13)
+    for rank_bits in range(1 << 13):
+        rank_count = bin(rank_bits).count("1")
+        if rank_count == 5:
+            flush7[rank_bits] = FLUSH_RANK[rank_bits]
+        elif rank_count in (6, 7):
+            flush7[rank_bits] = max(flush7[rank_bits ^ (1 << rank)] for rank in range(13) if rank_bits >> rank & 1)
+
+    nonflush7 = {}
+    for card_count in (5, 6, 7):
+        # rank combinations come out sorted low to high
+        for ranks in combinations_with_replacement(range(13), card_count):
+            if any(ranks[i] == ranks[i + 4] for i in range(card_count - 4)): # more than four of a rank
+                continue
+
+            hist = sum(1 << (4 * rank) for rank in ranks)
+            if card_count == 5:
+                if len(set(ranks)) == 5:
+                    nonflush7[hist] = UNIQUE_RANK[sum(1 << rank for rank in ranks)]
+                else:
+                    nonflush7[hist] = PRIME_RANK[prod(RANK_PRIMES[rank] for rank in ranks)]
+            else:
+                nonflush7[hist] = max(nonflush7[hist - (1 << (4 * rank))] for rank in set(ranks))
+
+    return flush7, nonflush7
+
+FLUSH7, NONFLUSH7 = _build_seven_tables()
+
+# numpy copies of the 7-card tables, nonflush7 as sorted keys to search with np.searchsorted
+FLUSH7_ARRAY = np.array(FLUSH7, dtype = np.int32)
+NONFLUSH7_KEYS = np.array(sorted(NONFLUSH7), dtype = np.int64)
+NONFLUSH7_RANKS = np.array([NONFLUSH7[key] for key in NONFLUSH7_KEYS.tolist()], dtype = np.int32)
+
+def _check_cards(cards):
+    """
+    Makes sure every card is a card int from DECK and no card shows up twice.
+    The compiled lookups have no bounds checks, so anything else would read outside the tables.
+    """
+
+    for card in cards:
+        if card not in CARD_ID:
+            raise ValueError(f"Invalid card: {card}. Cards must come from card_evaluator or DECK")
+
+    if len(set(cards)) != len(cards):
+        raise ValueError("The same card can't be used twice.")
+
+def _card_ids(cards):
+    """Turns card ints into an array of card ids for the compiled evaluator."""
+    return np.array([CARD_ID[card] for card in cards], dtype = np.int64)
+
+def eval7(cards):
+    """
+    Ranks the best 5-card hand out of 5 to 7 card ints without trying every five, higher is better.
+    Gives the same rank as hand_evaluator on the best five.
+    """
+
+    if not 5 <= len(cards) <= 7:
+        raise ValueError("We can only evaluate a hand of five to seven cards.")
+
+    _check_cards(cards)
+
+    return fasteval.eval7(_card_ids(cards), DECK_ARRAYS, FLUSH7_ARRAY, NONFLUSH7_KEYS, NONFLUSH7_RANKS)
+
+@lru_cache(maxsize = 4096)
+def _eval5_impl(cards):
+    """Ranks a sorted tuple of five card ints, cached (up to 4096 hands) as find_best_five keeps seeing the same fives."""
+    return fasteval.eval5(*cards, FLUSH_RANK_ARRAY, UNIQUE_RANK_ARRAY, PRIME_RANK_KEYS, PRIME_RANK_RANKS)
+
+def hand_evaluator(cards):
+    """
+    Evaluates a 5-card poker hand (five card ints). 
     
-    # looks at tie breakers and values if same type hand
-    for val1, val2 in zip(score1[1], score2[1]):
-        if val1 < val2:
-            return -1
-        if val2 < val1:
-            return 1
-        
-    # exact tie, only differs in suits
-    return 0    
+    Returns a single int rank from 1 to 7462, higher is better and equal ranks tie.
+    RANK_CATEGORY[rank] gives the score category (0 high card to 9 royal flush).
+    """
+
+    if len(cards) != 5:
+        raise ValueError("We can only have a five card hand to evaluate.")
+
+    _check_cards(cards)
+
+    # same five cards in any order give the same key
+    return _eval5_impl(tuple(sorted(cards)))
+
 
 def find_best_five(cards):
-    """ Finds the best five cards of seven (five down, two in hand) for you to play."""
+    """ Finds the best five cards of seven (five down, two in hand) for you to play.
+    Returns (best_hand, best_score) so the best hand does not need evaluating again."""
 
     if len(cards) < 5: 
         raise ValueError("Need at least 5 cards to make hand")
     
     best_hand = None
-    best_score = (-1, []) # dummy low score, empty tie breakers
+    best_score = 0 # dummy low score
 
     for five_cards in combinations(cards, 5):
         hand = list(five_cards)
         score = hand_evaluator(hand)
 
-        if best_hand is None:
+        if score > best_score:
             best_hand = hand
             best_score = score
-        else:
-            comparator = compare_scores(score, best_score)
-            if comparator > 0:
-                best_hand = hand
-                best_score = score
 
-    return best_hand
+    return best_hand, best_score
 
 def probability_calculator(my_hand, community_cards, player_count):
 
@@ -246,33 +353,25 @@ def probability_calculator(my_hand, community_cards, player_count):
     
     if len(community_cards) != 5:
         raise ValueError("All 5 community cards must be known in current functionality")
-    
-    my_best_hand = find_best_five(my_hand + community_cards)
-    my_score = hand_evaluator(my_best_hand)
 
-    # create deck, remove known cards
-    full_deck = create_deck()
-    known_cards = my_hand + community_cards
+    # also catches a card that is both in my hand and down on the table
+    _check_cards(list(my_hand) + list(community_cards))
+    
+    # remove known cards from deck
+    known_cards = set(my_hand) | set(community_cards)
 
-    remaining_deck = [card for card in full_deck
-                      if not any(card.rank == known.rank and card.suit == known.suit for known in known_cards)]
+    remaining_ids = [card_id for card_id, card in enumerate(DECK) if card not in known_cards]
     
     # calculate total number of opponent hands
-    opp_hands_count = comb(len(remaining_deck), 2)
-
-    wins = 0
-    ties = 0
-
-    # check my hand against all opponent hands
-    for opp_cards in combinations(remaining_deck, 2):
-        opp_best_hand = find_best_five(list(opp_cards) + community_cards)
-        opp_score = hand_evaluator(opp_best_hand)
-        comparator = compare_scores(my_score, opp_score)
+    opp_hands_count = comb(len(remaining_ids), 2)
 
-        if comparator > 0: # win
-            wins += 1
-        elif comparator == 0:
-            ties += 1
+    # check my hand against all opponent hands in compiled code
+    wins, ties = fasteval.simulate(
+        _card_ids(my_hand),
+        _card_ids(community_cards),
+        np.array(remaining_ids, dtype = np.int64),
+        DECK_ARRAYS, FLUSH7_ARRAY, NONFLUSH7_KEYS, NONFLUSH7_RANKS
+    )
 
     # calculate chance against one opponent
     win_probability = (wins + ties/2) / opp_hands_count
@@ -368,16 +467,18 @@ class PokerApp:
 
 #     print("\nEnter your two cards, with the card rank then suit (H, D, S, C). For example, AS for Ace of Spades, 10D for D of Diamonds.")
     
-#     # get player hand
+#     # get player hand, card ints are hashable so a set catches repeats
 #     my_hand = []
+#     entered_cards = set()
 #     while len(my_hand) < 2:
 #         try:
 #             card_str = input(f"Card {len(my_hand) + 1}: ")
 #             card = card_evaluator(card_str)
-#             if card in my_hand:
+#             if card in entered_cards:
 #                 print("This card has already been entered. Please enter a different card.")
 #                 continue
 #             my_hand.append(card)
+#             entered_cards.add(card)
 #         except ValueError as error:
 #             print(f"Invalid card: {error}")
 
@@ -389,11 +490,12 @@ class PokerApp:
 #         try: 
 #             card_str = input(f"Community card{len(community_cards) + 1}: ")
 #             card = card_evaluator(card_str)
-#             if card in my_hand or card in community_cards:
+#             if card in entered_cards:
 #                 print("This card has already been entered. Please enter a different card.")
 #                 continue
 
 #             community_cards.append(card)
+#             entered_cards.add(card)
 #         except ValueError as error:
 #             print(f"Invalid card: {error}")
 
@@ -411,8 +513,7 @@ class PokerApp:
 #             print(f"{error} was invalid. Please enter a valid number.")
 
 #     # calculate results
-#     best_hand = find_best_five(my_hand + community_cards)
-#     hand_score = hand_evaluator(best_hand)
+#     best_hand, hand_score = find_best_five(my_hand + community_cards)
 
 #     hand_types = ["High Card", "One Pair", "Two Pair", "Three of a Kind", "Straight", "Flush", "Full House", "Four of a Kind", "Straight Flush", "Royal Flush"]
 
@@ -420,9 +521,9 @@ class PokerApp:
 #     print("\nCalculating probability of winning...")
 #     probability = probability_calculator(my_hand, community_cards, player_count)
     
-#     print(f"Your hand: {my_hand}")
-#     print(f"Community cards: {community_cards}")
-#     print(f"Your best five-card hand: {best_hand} ({hand_types[hand_score[0]]})")
+#     print(f"Your hand: {[card_to_str(card) for card in my_hand]}")
+#     print(f"Community cards: {[card_to_str(card) for card in community_cards]}")
+#     print(f"Your best five-card hand: {[card_to_str(card) for card in best_hand]} ({hand_types[RANK_CATEGORY[hand_score]]})")
 #     print(f"Number of players: {player_count}")
 
 #     print(f"Probability of winning: ({probability*100:.2f}%)")